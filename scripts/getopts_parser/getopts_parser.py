@@ -14,6 +14,8 @@ You can find some usage example in @ref ./test_getopts_parser.py
 @file getopts_parser.py
 @section libs Librairies/Modules
 - getopt
+- collections
+- sys
 
 @section authors Author(s)
 - Created by Marchal Florent on 16/05/2024 .
@@ -21,6 +23,8 @@ You can find some usage example in @ref ./test_getopts_parser.py
 __author__ = "Marchal Florent"
 __credits__ = ["Marchal Florent"]
 import getopt
+import sys
+from collections import deque
 
 
 class GetoptsDigestionError(getopt.GetoptError):
@@ -144,7 +148,8 @@ def getopts_digester_check_item_endings(list_of_values: list[str], last_char: st
 
 def getopts_digest_available_options(getopts_options: dict[str, tuple[any, any]],
                                      dict_of_default_value: dict[str, any] = None) \
-        -> tuple[dict[str, tuple[any, any]], dict[str, str], dict[str, str], str, list[str]]:
+        -> tuple[dict[str, tuple[any, any]], dict[str, str], dict[str, str], str, list[str],
+                 dict[str, tuple[bool, str, tuple[any, any]]]]:
     """!
     @brief Transform @p getopts_options into usable instruction for @ref getopts_retrieve_options and assure that
     option's aliases are coherent.
@@ -168,10 +173,11 @@ def getopts_digest_available_options(getopts_options: dict[str, tuple[any, any]]
     {tuple_of_name: (short_name, (default_value, cast))}
     @endcode
     @param dict_of_default_value : dict[str, any] = None => Facultative, A dictionary that will be filled using options's
-    default values.
+    default values (see @ref getopts_default_values).
 
 
-     @return tuple[dict[str, tuple[any, any]], dict[str, str], dict[str, str], str, list[str]] =>
+     @return tuple[dict[str, tuple[any, any]], dict[str, str], dict[str, str], str, list[str],
+    dict[str, tuple[bool, str, tuple[any, any]]]] =>
     - option_dict : dict[str, tuple[any, any] => Contain each option's "main_name" associated with theirs  default and
         cast options. The "main_name" is the named that will be used into the dictionary
         returned by @ref getopts_parser.
@@ -179,6 +185,9 @@ def getopts_digest_available_options(getopts_options: dict[str, tuple[any, any]]
     - complex_keys : dict[str, str] => Contain all options aliases related to options that can handle more than two state
     - short_string : str => string that correspond to "shortopts" in  @ref getopt.getopt
     - long_list : list[str] => list of string that correspond to "longopts" in @ref getopt.getopt
+    - option_table : dict[str, tuple[bool, str, tuple[any, any]]] => Contain all options aliases as returned by
+    @ref getopt.getopt (e.g. "--help", "-h") associated with (Do the option ask for a value ?, "main_name" without
+    "=", default and cast options). Used by @ref getopts_parser to handle each option with a single lookup.
 
     """
     # Internal variables
@@ -187,6 +196,7 @@ def getopts_digest_available_options(getopts_options: dict[str, tuple[any, any]]
     short_string = ""
     long_list = []
     option_dict = {}
+    option_table = {}
 
     # Main loop
     for long_keys, short_keys_and_defaults in getopts_options.items():
@@ -268,28 +278,47 @@ def getopts_digest_available_options(getopts_options: dict[str, tuple[any, any]]
 
         # Save results
         option_dict[main_key] = defaults
+        ask_for_value = long_keys_ask_for_values is True
+        name = sys.intern(main_key[:-1] if ask_for_value else main_key)  # Interned : used as key of all results
+        keys_by_type = complex_keys if ask_for_value else boolean_keys
 
-        # Store available keys
+        # Store available keys (each alias is checked once against all aliases already seen)
         for keys in [*long_keys, *short_keys]:
-            if keys in complex_keys or keys in boolean_keys:
+            table_key = sys.intern(keys.rstrip("=:"))  # Option as returned by getopt.getopt
+            if table_key in option_table:
                 raise GetoptsOptionError(msg=f"Redundant option : {keys}", opt=keys)
 
-            if long_keys_ask_for_values is True:
-                complex_keys[keys] = main_key
+            option_table[table_key] = (ask_for_value, name, defaults)
+            keys_by_type[keys] = main_key
 
-                if dict_of_default_value is not None:
-                    dict_of_default_value[main_key[:-1]] = getopts_parser_complex_option(defaults, None, True)
+    if dict_of_default_value is not None:
+        dict_of_default_value.update(getopts_default_values(option_dict))
 
-            else:
-                boolean_keys[keys] = main_key
+    return option_dict, boolean_keys, complex_keys, short_string, long_list, option_table
+
+
+def getopts_default_values(option_dict: dict[str, tuple[any, any]]) -> dict[str, any]:
+    """!
+    @brief Compute the default value of each option of an option_dict from @ref getopts_digest_available_options.
+
+    @param option_dict : dict[str, tuple[any, any]] => option_dict returned by @ref getopts_digest_available_options
+
+    @return dict[str, any] => A dictionary that contain each option's "main_name" associated with its default value.
+    """
+    default_values = {}
+
+    for main_key, defaults in option_dict.items():
+        if main_key[-1] == "=":
+            default_values[main_key[:-1]] = getopts_parser_complex_option(defaults, None, True)
 
-                if dict_of_default_value is not None:
-                    dict_of_default_value[main_key] = getopts_parser_boolean_option(defaults, True)
+        else:
+            default_values[main_key] = getopts_parser_boolean_option(defaults, True)
 
-    return option_dict, boolean_keys, complex_keys, short_string, long_list
+    return default_values
 
 
-def getopts_retrieve_options(argv: list[str], short_string: str, long_list: list[str], main_options: list[str]) \
+def getopts_retrieve_options(argv: list[str], short_string: str, long_list: list[str], main_options: list[str],
+                             option_table: dict[str, tuple[bool, str, tuple[any, any]]] = None) \
         -> list[tuple[str, str]]:
     """!
     @brief Use a list of string from a command-line (e.g. sys.argv[1:]) to extract selected options and theirs
@@ -299,32 +328,50 @@ def getopts_retrieve_options(argv: list[str], short_string: str, long_list: list
     @param short_string : str => string that correspond to shortopts in  @ref getopt.getopt
     @param long_list : list[str] => list of string that correspond to longopts in @ref getopt.getopt
     @param main_options : list[str] => An ordered list of all options. Is used to determine the
-    correspondence between arguments and parameters.
+    correspondence between arguments and parameters. Arguments placed after an option are not given to options
+    already given in @p argv.
+    @param option_table : dict[str, tuple[bool, str, tuple[any, any]]] = None => option_table returned by
+    @ref getopts_digest_available_options. Used to recognize options given through an alias. If None, only long
+    options named like their main name are recognized.
 
     @return list[Tuple[str, str]] => A list composed of tuple that contain all selected options and associated with
     their values.
     """
 
     try:
-        # Obtain values from argv
-        opts, unparsed = getopt.getopt(argv, short_string, long_list)
-
-        # When argument are passed, all items end in unparsed.
-        if len(opts) == 0 and len(unparsed) >= 1:
-            i = 0
-
-            # Add an option to arguments
-            #     |---------- Length verification ----------| |- Option that accept value ? -|
-            while (i < len(unparsed) and i < len(main_options) and main_options[i][-1] == "="
-                   and unparsed[i * 2][0] != "-"):
-                #       |--- Not an option ---|
-                # =>  main_options[i][-1] be an option that accept a value and
-                # unparsed[i * 2][0] should not be a known option
-
-                unparsed.insert(i * 2, "--" + main_options[i][:-1])
-                i += 1
+        # Obtain values from argv, arguments (values that are not options) can be anywhere in argv
+        opts, unparsed = getopt.gnu_getopt(argv, short_string, long_list)
 
-            opts, unparsed = getopt.getopt(unparsed, short_string, long_list)
+        # Options given explicitly (by their main name)
+        if option_table is None:
+            given = {opt[2:] for opt, _ in opts}
+        else:
+            given = {option_table[opt][1] for opt, _ in opts}
+
+        # Leading options that accept a value
+        value_options = []
+        for option in main_options:
+            if option[-1] != "=":
+                break
+            value_options.append(option[:-1])
+
+        # Arguments before the first option are given, in order, to those options. They are placed before options
+        # so that an option given explicitly overrides its argument.
+        leading = 0
+        for value in argv:
+            if value[:1] == "-":
+                break
+            leading += 1
+
+        arguments = list(zip(value_options, unparsed[:leading]))
+
+        # Arguments after an option are given, in order, to the next options that are not given explicitly.
+        # Arguments left over are reported below.
+        free_options = [option for option in value_options[len(arguments):] if option not in given]
+        arguments += zip(free_options, unparsed[len(arguments):])
+        arguments = [("--" + option, value) for option, value in arguments]
+        opts = arguments + opts
+        unparsed = unparsed[len(arguments):]
 
         # Some options can not be parsed
         if unparsed:
@@ -345,7 +392,7 @@ def getopts_retrieve_options(argv: list[str], short_string: str, long_list: list
 
 
 def getopts_parser(argv: list[str] or str, getopts_options: dict[str, tuple[any, any]],
-                   *mandatory: str, fill_with_default_values=True) -> dict:
+                   *mandatory: str, fill_with_default_values=True, digested_options: tuple = None) -> dict:
     """!
     @brief Internal version of @ref getopts. You can use this function if you don't need @ref getopts ' overcoat. (help message display and error handling)
 
@@ -356,64 +403,57 @@ def getopts_parser(argv: list[str] or str, getopts_options: dict[str, tuple[any,
     @param getopts_options : dict[str, tuple[any, any]] => A dictionary that contain options.
     @param *mandatory : str =>a list of options whose value must be entered
     @param fill_with_default_values = True => Every unused options are added to the final dict using defaults values
+    @param digested_options : tuple = None => Result of @ref getopts_digest_available_options for @p getopts_options.
+    Avoid digesting @p getopts_options at each call.
 
     @return dict => A dictionary that contain options.
     """
     final_values = {}
-    mandatory = set(mandatory)
+    mandatory = {sys.intern(opt) for opt in mandatory}
 
     # str compatibility
     if isinstance(argv, str):
         argv = argv.split(" ")
 
     # digest @p getopts_options
+    if digested_options is None:
+        digested_options = getopts_digest_available_options(getopts_options)
+
+    option_dict, boolean_keys, complex_keys, short_string, long_list, option_table = digested_options
+
     if fill_with_default_values:
-        option_dict, boolean_keys, complex_keys, short_string, long_list \
-            = getopts_digest_available_options(getopts_options, final_values)
-    else:
-        option_dict, boolean_keys, complex_keys, short_string, long_list \
-            = getopts_digest_available_options(getopts_options)
+        final_values.update(getopts_default_values(option_dict))
 
     # extract options from argv
-    options = getopts_retrieve_options(argv, short_string, long_list, main_options=list(option_dict))
+    options = deque(getopts_retrieve_options(argv, short_string, long_list, main_options=list(option_dict),
+                                             option_table=option_table))
 
     # Fill final_values
-    for opt in options:
-        opt, value = opt
+    while options:
+        opt, value = options.popleft()
+        ask_for_value, parent, value_restriction = option_table[opt]
 
-        if opt in boolean_keys:
+        if not ask_for_value:
             # "-opt"
             if value:
                 # Sometime, when there is multiple chars after a '-' (e.g. -atcg) some letters are considered as value :
                 # --> -atcg <=W ('-a', 'tcg')
-                options.extend([("-" + char, "") for char in value])
+                options.extend(("-" + char, "") for char in value)
 
             # Apply value restriction
-            parent = boolean_keys[opt]
-            value = getopts_parser_boolean_option(option_dict[parent])
+            value = getopts_parser_boolean_option(value_restriction)
 
-            if parent in mandatory:
-                mandatory.remove(parent)
-            
         else:
-            if value and value[0] == "-" and value in complex_keys or value in boolean_keys:
+            if value and value[0] == "-" and value in option_table:
                 # Avoid that an option is taken as value by another one
                 # Still allow negative numbers
                 raise GetoptsOptionError(f"The option '{opt}' is followed by a parameter '{value}' instead of "
                                          f"a value.")
 
             # Apply value restriction
-            if opt[0:2] == "--":
-                parent = complex_keys[opt + "="]
+            value = getopts_parser_complex_option(value_restriction, value)
 
-            else:
-                parent = complex_keys[opt + ":"]
-
-            value = getopts_parser_complex_option(option_dict[parent], value)
-            parent = parent[:-1]
-
-            if parent in mandatory:
-                mandatory.remove(parent)
+        mandatory.discard(parent)
 
         # Save result
         final_values[parent] = value
@@ -427,8 +467,9 @@ def getopts_parser(argv: list[str] or str, getopts_options: dict[str, tuple[any,
 
 
 def getopts(argv: list[str] or str, getopts_options: dict[str or tuple, None or tuple[any, any] or any],
-            *mandatory: str, help_message: str = None, fill_with_default_values=True,
-            raise_errors=False, help_options: str or tuple[str] = ("help", )) -> dict[str, any] or int:
+            *mandatory: str, help_message: str or callable = None, fill_with_default_values=True,
+            raise_errors=False, help_options: str or tuple[str] = ("help", ),
+            digested_options: tuple = None) -> dict[str, any] or int:
     """!
     @brief Directly extract options from a command line into a dict. All option's values are cast according to a
      dictionary @getopts_options which specifies option's short name (-h), option's long names (--help),
@@ -479,11 +520,14 @@ def getopts(argv: list[str] or str, getopts_options: dict[str or tuple, None or
     @warning do not use "-" in your options names
 
     @param *mandatory : str => a list of options whose value must be entered.
-    @param help_message : str = None => A message displayed when an error is encountered or when "help" is triggered.
+    @param help_message : str or callable = None => A message displayed when an error is encountered or when "help" is
+    triggered. If callable, it is called (without argument) only when the message is displayed.
     @param fill_with_default_values = True => When True, the returned dict contains all options
     @param raise_errors = False => Do caught errors are raised ?
     @param help_options : str or tuple[str] = ("help", ) => A tuple of option name that trigger @p help_message.
     Those options are always removed from the returned dictionary.
+    @param digested_options : tuple = None => Result of @ref getopts_digest_available_options for @p getopts_options.
+    Useful when @p getopts_options is a constant : it is digested only once.
 
     @return dict[str, any] or int =>
         -  dict[str, any] A dictionary that contain values related to options triggered by the command-line.
@@ -522,7 +566,8 @@ def getopts(argv: list[str] or str, getopts_options: dict[str or tuple, None or
     # Catch errors raised by getopts_parser
     try:
         vals = getopts_parser(argv, getopts_options, *mandatory,
-                              fill_with_default_values=fill_with_default_values)
+                              fill_with_default_values=fill_with_default_values,
+                              digested_options=digested_options)
 
     except getopt.GetoptError as E:
         # An error occurred
@@ -530,6 +575,7 @@ def getopts(argv: list[str] or str, getopts_options: dict[str or tuple, None or
               f"\n{E.msg}")
 
         if help_message:
+            help_message = help_message() if callable(help_message) else help_message
             print(f"\nHere some help regarding the use of this script : \n{help_message}")
 
         if raise_errors is True:
@@ -543,14 +589,8 @@ def getopts(argv: list[str] or str, getopts_options: dict[str or tuple, None or
 
     # Do a help message should be displayed ( => Do an option in help_opt is inside vals and vals[options] is True)
     for help_opt in help_options:
-        if help_opt not in vals:
-            continue
-
-        if vals[help_opt]:
-            print(help_message)
+        if vals.pop(help_opt, False):
+            print(help_message() if callable(help_message) else help_message)
             return 2
 
-        else:
-            del vals[help_opt]
-
     return vals
@@ -87,6 +87,37 @@ def test_simple_option():
     assert val["Lambda"] is False
     print("\tSuccess\n")
 
+    print("Arguments after options")
+    val = getopts_parser.getopts("--Eta Test1 --Iota Test2", options_, fill_with_default_values=False)
+    assert val == {"Alpha": "Test1", "Beta": "Test2", "Eta": True, "Iota": True}
+    print("\tSuccess\n")
+
+    print("Arguments after options skip options already given")
+    val = getopts_parser.getopts("--Alpha Test1 Test2", options_, fill_with_default_values=False)
+    assert val == {"Alpha": "Test1", "Beta": "Test2"}
+    with pytest.raises(getopts_parser.GetoptsParsingError):
+        getopts_parser.getopts("--Alpha Test1 Test2 Test3", options_, raise_errors=True)
+    print("\tSuccess\n")
+
+    print("Less arguments than options")
+    val = getopts_parser.getopts("Test1", options_, fill_with_default_values=False)
+    assert val == {"Alpha": "Test1"}
+    print("\tSuccess\n")
+
+    print("Help message built only when displayed")
+    calls = []
+
+    def help_message():
+        calls.append("help")
+        return "Help"
+
+    val = getopts_parser.getopts("Test1 --Iota", options_, help_message=help_message, help_options="Eta")
+    assert val["Alpha"] == "Test1" and "Eta" not in val
+    assert not calls
+    assert getopts_parser.getopts("Test1 --Eta", options_, help_message=help_message, help_options="Eta") == 2
+    assert calls == ["help"]
+    print("\tSuccess\n")
+
 
 def test_aliases():
     """!
@@ -174,6 +205,17 @@ def test_aliases():
     with pytest.raises(getopts_parser.GetoptsDigestionError):
         getopts_parser.getopts("-a Test1 --Beta Test -b temp", options_, raise_errors=True)
 
+    print("\nRedundant :")
+    del options_[("Bozo", "Bozo2=", "Bozo3")]
+    options_[("Bozo", "Zeta")] = None
+    with pytest.raises(getopts_parser.GetoptsOptionError):
+        getopts_parser.getopts("-a Test1", options_, raise_errors=True)
+
+    del options_[("Bozo", "Zeta")]
+    options_["Bozo"] = ("t", None)
+    with pytest.raises(getopts_parser.GetoptsOptionError):
+        getopts_parser.getopts("-a Test1", options_, raise_errors=True)
+
     print("\tSuccess\n")
 
 
@@ -239,6 +281,16 @@ def test_defaults_values():
         getopts_parser.getopts("1 --Eta --Iota --Beta", options_, raise_errors=True)
     print("\tSuccess\n")
 
+    print("Digested options :")
+    digested = getopts_parser.getopts_digest_available_options(options_)
+    assert getopts_parser.getopts_default_values(digested[0])["Epsilon"] == "Star"
+
+    val = getopts_parser.getopts("1 --Eta --Iota --Beta Test2", options_, digested_options=digested)
+    assert val == getopts_parser.getopts("1 --Eta --Iota --Beta Test2", options_)
+    assert val["Alpha"] == 1
+    assert val["Gamma"] is True
+    print("\tSuccess\n")
+
 
 def test_all():
     """!
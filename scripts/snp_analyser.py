@@ -29,6 +29,9 @@ This module has been made in 2024 during an internship at the UMR Agap, GE2pop (
 @section libs Librairies/Modules
   - os
   - json
+  - hashlib
+  - tempfile
+  - numpy
   - matplotlib.pyplot
   - sys
   - getopts_parser
@@ -37,8 +40,14 @@ This module has been made in 2024 during an internship at the UMR Agap, GE2pop (
 # Native libraries
 import os
 import json
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import islice
 
 try:
+    import numpy as np
     from scripts.utilities.utilities import export_list_in_tsv_as_rows, chart_export, make_bar_char, make_heatmap, \
         parse_line, extract_data_from_table, FilterError
     from scripts.getopts_parser import getopts_parser
@@ -52,6 +61,9 @@ except ModuleNotFoundError as E:
     elif E.name == "utilities":
         print(f"Make sure that 'utilities/' is in the same folder as {__file__}")
 
+    elif E.name == "numpy":
+        print("Open a terminal and try : \n\tpip install numpy")
+
     exit(1)
 
 __author__ = "Marchal Florent"
@@ -94,9 +106,16 @@ __getopts__ = {
     "transparent": (None, (False, True)),
     "start_at_0": (None, (False, True)),
     "percent": (None, (False, True)),
-    "legends=": (None, (None, str))
+    "legends=": (None, (None, str)),
+    "cache": (None, (False, True))
 }
 
+# __getopts__ is a constant, it is digested only once
+__digested_getopts__ = getopts_parser.getopts_digest_available_options(__getopts__)
+
+# Where the number of snp of each file is saved when the cache is enabled
+default_cache_folder = os.path.join(os.path.expanduser("~"), ".cache", "snpheatmap")
+
 default_legends = {
   "classic": {
     "quantitative_barchart": {
@@ -147,6 +166,7 @@ default_legends = {
 }
 
 
+@lru_cache(maxsize=1)
 def help_usage():
     option_list = ""
     for key, (short_key, _) in __getopts__.items():
@@ -212,7 +232,162 @@ def filter_integer_greater_or_equal_to_0_ignore_0(key: str or int, dictionary: d
     return filter_integer_greater_or_equal_to_0(key, dictionary, include_0=False)
 
 
-def compile_gene_snp(genes_snp: iter, dict_of_number: dict[int, dict[str, int]] = None,
+def filter_snp_counts(genes_snp: iter or dict[str, str or int], include_0: bool = True) -> dict[str, int]:
+    """!
+    @brief Cast all values of @p genes_snp into integers and keep those that are greater or equal to 0.
+    Vectorized counterpart of @ref filter_integer_greater_or_equal_to_0 : values are checked all at once instead of
+    calling a filter_ on each line inside @ref extract_data_from_table.
+
+    @param genes_snp : iterable or dict[str, str or int] => Pairs (gene_name, number_of_snp) from
+    @ref extract_data_from_table, or a dict {gene_name: number_of_snp}
+    @param include_0 : bool = True => Do genes with 0 snp are kept
+
+    @return dict[str, int] => @p genes_snp without filtered genes. Values are integers. When a gene is present
+    multiple times, only the last occurrence is used (all occurrences are checked).
+    @raise FilterError when a value can not be cast into an integer or when a value is lower than 0
+    """
+    if isinstance(genes_snp, dict):
+        genes_snp = genes_snp.items()
+
+    # Every pair is checked, including those of genes that occur again later
+    names, values = [], []
+    for name, value in genes_snp:
+        names.append(name)
+        values.append(value)
+
+    try:
+        # numpy parses the strings itself, without creating one python int per gene
+        counts = np.array(values, dtype=np.int64)
+    except (ValueError, OverflowError) as E:
+        raise FilterError(f"Invalid number of snp : {E}")
+
+    negatives = np.flatnonzero(counts < 0)
+    if negatives.size:
+        raise FilterError(f"Integer lower than 0 for '{names[negatives[0]]}' : {counts[negatives[0]]}")
+
+    # The last occurrence of each gene is kept, then 0 are removed if needed
+    genes_snp = dict(zip(names, counts.tolist()))
+    if not include_0:
+        genes_snp = {name: count for name, count in genes_snp.items() if count > 0}
+
+    return genes_snp
+
+
+def load_snp_counts(path: str, name_column: str, snp_column: str, separator: str = "\t", include_0: bool = True,
+                    chunk_size: int = 1_000_000) -> dict[str, int]:
+    """!
+    @brief Read the number of snp of each gene inside a flatfile. The file is read by chunks of @p chunk_size lines :
+    only the current chunk is kept as strings, already read genes are stored as integers.
+
+    @param path : str => Path to a flatFile.
+    @param name_column : str => Name of the column that contain genes' names
+    @param snp_column : str => Name of the column that contain the number of snp
+    @param separator : str = "\t" => The separator used in the flatfile.
+    @param include_0 : bool = True => Do genes with 0 snp are kept
+    @param chunk_size : int = 1_000_000 => Number of lines converted at once.
+
+    @return dict[str, int] => {gene_name: number_of_snp}. When a gene is present multiple times, only the last
+    occurrence is used.
+    @raise FilterError when a value can not be cast into an integer or when a value is lower than 0
+    """
+    genes_snp = {}
+    lines = extract_data_from_table(path, key=name_column, value=snp_column, separator=separator)
+
+    try:
+        # Chunks are kept as pairs : every line is checked before duplicated genes are merged
+        while chunk := list(islice(lines, chunk_size)):
+            genes_snp.update(filter_snp_counts(chunk))
+
+    except FilterError as E:
+        # Files can be read concurrently : the message must tell which file is wrong
+        raise FilterError(f"Filter error in the column '{snp_column}' in the file {path} : \n {E}") from E
+
+    # 0 are removed once all chunks are read, so that a later occurrence of a gene still replaces the previous one.
+    if not include_0:
+        genes_snp = filter_snp_counts(genes_snp, include_0=False)
+
+    return genes_snp
+
+
+def get_snp_counts(path: str, name_column: str, snp_column: str, separator: str = "\t", include_0: bool = True,
+                   cache_folder: str = None) -> np.ndarray:
+    """!
+    @brief Number of snp of each gene inside a flatfile (see @ref load_snp_counts).
+    Results are kept in memory (see @ref get_snp_counts_of_file_state) as long as the file is not modified.
+    When @p cache_folder is given, the result is also saved inside this folder and reused as long as the file is not
+    modified (same path, modification time and size) and read with the same arguments.
+
+    @param path : str => Path to a flatFile.
+    @param name_column : str => Name of the column that contain genes' names
+    @param snp_column : str => Name of the column that contain the number of snp
+    @param separator : str = "\t" => The separator used in the flatfile.
+    @param include_0 : bool = True => Do genes with 0 snp are kept
+    @param cache_folder : str = None => A folder used to cache results. If None, nothing is cached on disk.
+
+    @return np.ndarray => Number of snp of each gene (read only). Can be used by @ref compile_gene_snp
+    @raise FilterError when a value can not be cast into an integer or when a value is lower than 0
+    """
+    stat = os.stat(path)
+    return get_snp_counts_of_file_state(os.path.abspath(path), stat.st_mtime_ns, stat.st_size,
+                                        name_column, snp_column, separator, include_0, cache_folder)
+
+
+@lru_cache(maxsize=256)
+def get_snp_counts_of_file_state(path: str, mtime_ns: int, size: int, name_column: str, snp_column: str,
+                                 separator: str, include_0: bool, cache_folder: str or None) -> np.ndarray:
+    """!
+    @brief Memoized part of @ref get_snp_counts. @p mtime_ns and @p size are only part of the key, so that a modified
+    file is read again.
+
+    @param path : str => Absolute path to a flatFile.
+    @param mtime_ns : int => Modification time of @p path (os.stat(path).st_mtime_ns)
+    @param size : int => Size of @p path (os.stat(path).st_size)
+    @param name_column : str => Name of the column that contain genes' names
+    @param snp_column : str => Name of the column that contain the number of snp
+    @param separator : str => The separator used in the flatfile.
+    @param include_0 : bool => Do genes with 0 snp are kept
+    @param cache_folder : str or None => A folder used to cache results. If None, nothing is cached on disk.
+
+    @return np.ndarray => Number of snp of each gene (read only, the same array is returned to each call)
+    @raise FilterError when a value can not be cast into an integer or when a value is lower than 0
+    """
+    cache_path = None
+
+    if cache_folder is not None:
+        cache_key = f"{path}:{mtime_ns}:{size}:{name_column}:{snp_column}:{separator}:{include_0}"
+        cache_path = os.path.join(cache_folder, hashlib.sha1(cache_key.encode()).hexdigest() + ".npy")
+
+    snp_counts = None
+    if cache_path is not None and os.path.isfile(cache_path):
+        try:
+            snp_counts = np.load(cache_path, allow_pickle=False)
+        except (ValueError, OSError, EOFError):
+            # Unreadable cache file : it is computed and saved again
+            snp_counts = None
+
+    if snp_counts is None:
+        genes_snp = load_snp_counts(path, name_column, snp_column, separator=separator, include_0=include_0)
+        snp_counts = np.fromiter(genes_snp.values(), dtype=np.int64, count=len(genes_snp))
+
+        if cache_path is not None:
+            # Written in a temporary file then renamed, so that cache_path is never a partially written file
+            os.makedirs(cache_folder, exist_ok=True)
+            temp_fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_folder)
+            try:
+                with os.fdopen(temp_fd, "wb") as temp_file:
+                    np.save(temp_file, snp_counts)
+                os.replace(temp_path, cache_path)
+
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    # The array is shared by all calls
+    snp_counts.flags.writeable = False
+    return snp_counts
+
+
+def compile_gene_snp(genes_snp: iter or np.ndarray, dict_of_number: dict[int, dict[str, int]] = None,
                      group: str = "None") -> dict[int, dict[str, int]]:
     """!
     @brief Extract the number of snp of all genes contained in @p genes_snp (snp = @p genes_snp 's values).
@@ -220,34 +395,37 @@ def compile_gene_snp(genes_snp: iter, dict_of_number: dict[int, dict[str, int]]
     of all keys (i.e. snp number). This dict contain the @p group (key) and the number of occurrences of this
     snp number for this key.
 
-    @param genes_snp : iterable => A generator from @ref extract_data_from_table.
-        e.g. (number_of_snp_in_gene_1, ) =>  @code (3, 5, 3)  @endcode
+    @param genes_snp : iterable or np.ndarray => Pairs (gene, number_of_snp) from @ref extract_data_from_table or
+    @ref filter_snp_counts, or directly an array that contain the number of snp of each gene.
+        e.g. ((gene_1, number_of_snp_in_gene_1), ) =>  @code (("a", 3), ("b", 5), ("c", 3))  @endcode
         @note Values (number of snp) inside this dict are trans typed into integers.
     @param dict_of_number : dict[int, dict[str,int]] = None.
-        A dict with the same structure as dictionaries returned by this function.
+        A dict with the same structure as dictionaries returned by this function. It is updated in place and returned.
     @param group : str = "None" => Each occurrence of a number of snp increment the counter related to this group.
 
-    @return dict[int, dict[str, int]] => A dictionary that store all number of snp found along with the number of
-    occurrences @code {number_of_snp_1 : {group1: number_of_occurrences_of_number_of_snp_1_in_this_group} @endcode
+    @return dict[int, dict[str, int]] => A dictionary (@p dict_of_number when given) that store all number of snp
+    found along with the number of occurrences
+    @code {number_of_snp_1 : {group1: number_of_occurrences_of_number_of_snp_1_in_this_group} @endcode
 
     @warning values @p genes_snp are cast into integer. Also, there is no verification made to see if the values are
-    positive. We assume that data has been filtered using @ref filter_integer_greater_or_equal_to_0 in
-    @ref extract_data_from_table
+    positive. We assume that data has been filtered using @ref filter_snp_counts
     """
     dict_of_number = {} if dict_of_number is None else dict_of_number
 
-    for _, snp_count in genes_snp:
-        snp_count = int(snp_count)
+    if not isinstance(genes_snp, np.ndarray):
+        genes_snp = np.fromiter((int(snp_count) for _, snp_count in genes_snp), dtype=np.int64)
 
-        # Add this 'snp_count' to dict_of_number
-        if snp_count not in dict_of_number:
-            dict_of_number[snp_count] = {}
+    if genes_snp.size == 0:
+        return dict_of_number
 
-        # Add this 'group' to dict_of_number[snp_count]
-        if group not in dict_of_number[snp_count]:
-            dict_of_number[snp_count][group] = 0
+    # Number of genes for each number of snp
+    occurrences = np.bincount(genes_snp)
 
-        dict_of_number[snp_count][group] += 1
+    # Only numbers of snp found at least once are added
+    snp_counts = np.flatnonzero(occurrences)
+    for snp_count, count in zip(snp_counts.tolist(), occurrences[snp_counts].tolist()):
+        groups = dict_of_number.setdefault(snp_count, {})
+        groups[group] = groups.get(group, 0) + count
 
     return dict_of_number
 
@@ -322,42 +500,94 @@ def make_data_matrix(compiled_dict: dict[int, dict[str, int]], group: str, *grou
 
     # Variables
     groups = [group, *groups]  # Merge @p group and @p groups
-    data = [list() for _ in range(0, len(groups))]  # Data matrix
-    last_x_value = start_value - 1  # Remember the last value
     sorted_x_values = sorted(compiled_dict)  # Snp size from compiled_dict sorted y size
 
     # Apply the @p max_length by reducing the size of "sorted_x_values"
     if max_length is not None and len(sorted_x_values) >= max_length:
         sorted_x_values = sorted_x_values[:max_length]
 
+    # Column of each snp number inside the matrix. When @p simplified is False, snp numbers represented by 0 genes
+    # keep their own (empty) column.
+    if simplified is True:
+        columns = np.arange(len(sorted_x_values))
+        x_legend = sorted_x_values
+    else:
+        columns = np.array(sorted_x_values, dtype=np.int64) - start_value
+        x_legend = list(range(start_value, sorted_x_values[-1] + 1)) if sorted_x_values else []
+
+    # Rows of each group (a group can be asked more than once)
+    group_rows = {}
+    for i, group_name in enumerate(groups):
+        group_rows.setdefault(group_name, []).append(i)
+
+    # Position and value of each non-zero cell. Snp numbers lower than start_value have no column.
+    rows, cells_columns, values = [], [], []
+    for column, x_values in zip(columns.tolist(), sorted_x_values):
+        if column < 0:
+            continue
+
+        for group_name, occurrences in compiled_dict[x_values].items():
+            for i in group_rows.get(group_name, ()):
+                rows.append(i)
+                cells_columns.append(column)
+                values.append(occurrences)
+
     # Fill data
-    for x_values in sorted_x_values:
-        group_at_this_position = compiled_dict[x_values]
+    data = np.zeros((len(groups), len(x_legend)), dtype=np.int64)  # Data matrix
+    data[rows, cells_columns] = values
+
+    # Return the matrix and the legend
+    return data.tolist(), x_legend
 
-        # missing_x_values is append at by each groups in order to extend the matrix.
-        # the last value (pos -1) is always rewrote in the next loop
-        missing_x_values = [0]
-        if simplified is False:
-            # When there is snp numbers represented by 0 genes, we add them using missing_x_values
-            missing_x_values *= (x_values - last_x_value)
 
-        # For each group, extend the matrix
-        for i, group_name in enumerate(groups):
-            data[i].extend(missing_x_values)
+def compile_data_matrix(snp_counts: dict[str, np.ndarray], group: str, *groups: str,
+                        simplified: bool = True, max_length: int = None,
+                        start_value: int = 1) -> (list[list[int]], list[int]):
+    """!
+    @brief Create the same matrix as @ref make_data_matrix directly from the number of snp of each gene,
+    without building the dict of @ref compile_gene_snp :
+    @code
+    compile_data_matrix({"a": a_counts, "b": b_counts}, "a", "b")
+    make_data_matrix(compile_gene_snp(b_counts, compile_gene_snp(a_counts, group="a"), group="b"), "a", "b")
+    @endcode
+
+    @param snp_counts : dict[str, np.ndarray] => Number of snp of each gene (see @ref get_snp_counts) of each group
+    @param group : str => A group name (e.g. Species name : "E. coli")
+    @param *groups : str => Same as @p group. Additional species name.
+    @param simplified : bool = True => Do number of snp represented by 0 gene are deleted from the result ?
+    @param max_length : int = None => Limit the length of each lines of the matrix. should be greater than 0. If not,
+    max_length is ignored.
+    @param start_value: int = 1 => First value of the matrix.
 
-            # Store the value of this snp number
-            if group_name in group_at_this_position:
-                data[i][-1] = group_at_this_position[group_name]
+    @return (list[list[int]], list[int]) => See @ref make_data_matrix
+    """
+    if max_length is None or max_length <= 0:
+        max_length = None
+
+    groups = [group, *groups]  # Merge @p group and @p groups
 
-        # Update last_x_value
-        last_x_value = x_values
+    # Number of genes for each number of snp, for each group
+    occurrences = {group_name: np.bincount(counts) for group_name, counts in snp_counts.items()}
+    width = max((len(group_occurrences) for group_occurrences in occurrences.values()), default=0)
+
+    matrix = np.zeros((len(groups), width), dtype=np.int64)
+    for i, group_name in enumerate(groups):
+        if group_name in occurrences:
+            matrix[i, :len(occurrences[group_name])] = occurrences[group_name]
+
+    # Snp numbers represented by at least one gene in any group
+    present = np.zeros(width, dtype=bool)
+    for group_occurrences in occurrences.values():
+        present[:len(group_occurrences)] |= group_occurrences > 0
+
+    sorted_x_values = np.flatnonzero(present)[:max_length].tolist()
 
     # Return the matrix and the legend
     if simplified is True:
-        return data, sorted_x_values
+        return matrix[:, sorted_x_values].tolist(), sorted_x_values
 
-    else:
-        return data, list(range(start_value, sorted_x_values[-1] + 1))
+    last_x_value = sorted_x_values[-1] + 1 if sorted_x_values else start_value
+    return matrix[:, start_value:last_x_value].tolist(), list(range(start_value, last_x_value))
 
 
 def generate_cumulative_list(list_of_numbers: list[int] or list[float], reversed_=False, percent=False) -> list[
@@ -375,31 +605,23 @@ def generate_cumulative_list(list_of_numbers: list[int] or list[float], reversed
     @return list[int] => A list of number
 
     """
+    numbers = np.asarray(list_of_numbers)
+    if numbers.size == 0:
+        return []
 
-    cumulative_list = []
-    tot = 0
-
-    # Select the correct way to browse list_of_numbers
+    # Accumulate values in the correct direction, the total is the last accumulated value
     if reversed_:
-        index_range = list(range(-1, -(len(list_of_numbers) + 1), -1))
+        cumulative_list = np.cumsum(numbers[::-1])[::-1]
+        tot = cumulative_list[0]
     else:
-        index_range = list(range(0, len(list_of_numbers)))
-
-    # Fill cumulative_list
-    for i in index_range:
-        tot += list_of_numbers[i]
-        cumulative_list.append(tot)
+        cumulative_list = np.cumsum(numbers)
+        tot = cumulative_list[-1]
 
     # Apply the percent
     if percent:
-        for i in index_range:
-            cumulative_list[i] = cumulative_list[i] / tot * 100
-
-    # Reverse cumulative_list when needed
-    if reversed_:
-        cumulative_list.reverse()
+        cumulative_list = cumulative_list / tot * 100
 
-    return cumulative_list
+    return cumulative_list.tolist()
 
 
 def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t",
@@ -411,7 +633,7 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
          sort_by_name: bool = True, uniform_y: bool = True, transparent: bool = True,
          show_values: int = -1, legends: str = None,
          start_at_0: bool = True,
-         percent: bool = False) -> int:
+         percent: bool = False, cache: bool = False) -> int:
     """!
     @brief Create a number of chart related to snp analysis.
 
@@ -423,7 +645,7 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
 
     @param path : str => Path that lead to a number of flatfile :
         - .json : {complete file path : Species name}
-        - folder : Use file inside the folder (does not scan the folder recursively)
+        - folder : Use file inside the folder (does not scan the folder recursively, hidden files are ignored)
 
     @param name_column : str => Name of the column that contain a primary key e.g. GeneName, GeneID. If two line
     have the same "primary key", the last one will be used.
@@ -450,18 +672,28 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
     @param svg : bool = True => Do created charts are saved as svg (vectorize image)
     @param sort_by_name : bool = True => Do species are sorted in lexicographic order ?
     @param uniform_y : bool = True => Do all barchart share the same y-axis ?
-    @param show_values : int = None => If greater or equal to 0, all cells will contain theirs values. if lower than 0,
-    text in cell in automatically determined (can be ugly when show is True, but assure that the text is good in
-    png and svg). If None, nothing happen.
+    @param show_values : int = None => If greater or equal to 0, all cells will contain theirs values (cells equal to 0
+    stay empty). if lower than 0, text in cell in automatically determined (can be ugly when show is True, but assure
+    that the text is good in png and svg). If None, nothing happen.
     @param transparent : bool = True => Chart are exported with a transparent background
     @param start_at_0 : bool = True => Charts shows the number of genes in the first column / cell
     @param percent : bool = True => Show percent instead of raw values.
+    @param cache : bool = False => The number of snp of each file is saved in @ref default_cache_folder and reused
+    in next executions as long as the file is not modified.
 
     @return int => if greater than 0, an error occurred.
     - 1 job stopped by user
     - 2 no species found
     """
-    parameters = locals().copy()
+    # Arguments as received, saved for traceability
+    parameters = {"path": path, "name_column": name_column, "snp_column": snp_column,
+                  "file_separator": file_separator, "simplified": simplified, "max_length": max_length,
+                  "output_path": output_path, "output_warning": output_warning, "job_name": job_name,
+                  "global_heatmap": global_heatmap, "quantitative_barchart": quantitative_barchart,
+                  "cumulative_barchart": cumulative_barchart, "cumulative_heatmap": cumulative_heatmap, "tsv": tsv,
+                  "png": png, "show": show, "svg": svg, "sort_by_name": sort_by_name, "uniform_y": uniform_y,
+                  "transparent": transparent, "show_values": show_values, "legends": legends,
+                  "start_at_0": start_at_0, "percent": percent, "cache": cache}
 
     # Set a default name for output_path
     if job_name is None or len(job_name) == 0:
@@ -491,53 +723,52 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
     # ---- ---- Path Management ---- ---- #
     # Assure that @p output_path point to a folder
     if output_path is None or output_path == "":
-        output_path = "output/"
-
-    if output_path[-1] not in ("/", "\\"):
-        output_path += "/"
+        output_path = "output"
 
     # Create @p output_path if needed
-    if not os.path.exists(output_path):
-        os.mkdir(output_path)
+    os.makedirs(output_path, exist_ok=True)
 
     # Load files
-    if path[-5:] == ".json":
+    if path.endswith(".json"):
         with open(path, "r", encoding="utf-8") as js_flux:
             path_translation = dict(json.load(js_flux))
-            list_of_files = path_translation
-            file_path_prefix = ""
+
+        list_of_files = list(path_translation)  # Preserves the order of the json file
+        file_path_prefix = ""
 
     else:
         # Assure that @p path point to a folder
-        if path[-1] not in ("/", "\\"):
-            file_path_prefix = path + "/"
-        else:
-            file_path_prefix = path
+        file_path_prefix = os.path.join(path, "")
 
-        list_of_files = os.listdir(file_path_prefix)
+        # Hidden files and sub-folders are ignored
+        with os.scandir(file_path_prefix) as entries:
+            list_of_files = [entry.name for entry in entries if entry.name[0] != "." and entry.is_file()]
         path_translation = {}
 
     # Create file and directory path
-    output_dir = output_path + job_name + "/"
-    file_prefix = output_dir + job_name + "_"
+    output_dir = os.path.join(output_path, job_name, "")
+    file_prefix = os.path.join(output_dir, os.path.basename(os.path.normpath(job_name)) + "_")  # job_name can be nested
     heatmap_prefix = file_prefix + "Heatmap"
     cumulative_prefix = file_prefix + "CumulativeBarchart_"
     quantitative_prefix = file_prefix + "QuantitativeBarchart_"
 
     # Generate output_dir
-    if not os.path.exists(output_dir):
-        os.mkdir(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Verify that the folder is empty (the scan stops at the first entry found)
+    if output_warning:
+        with os.scandir(output_dir) as entries:
+            output_dir_is_empty = not any(entries)
 
-    # Verify that the folder is empty
-    elif output_warning and os.listdir(output_dir):
-        r_ = input(f"Folder is not empty. Some files can be lost. ({output_dir})\nContinue ? (y / n) :")
+        if not output_dir_is_empty:
+            r_ = input(f"Folder is not empty. Some files can be lost. ({output_dir})\nContinue ? (y / n) :")
 
-        if r_.lower() not in ("y", "ye", "yes", "t", "tr", "tru", "true"):
-            print("Job stopped")
-            return 2
+            if r_.lower() not in ("y", "ye", "yes", "t", "tr", "tru", "true"):
+                print("Job stopped")
+                return 2
         
     # Traceability
-    output_readme = open(f"{output_dir}/README.md", "w")
+    output_readme = open(os.path.join(output_dir, "README.md"), "w")
     output_readme.write(f"Generated with SnpHeatMap {__version__}.\n")
     output_readme.write("Arguments :\n")
     json.dump(parameters, output_readme, indent=True)
@@ -550,55 +781,53 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
     output_readme.write("\n\n")
 
     # ---- ---- Export Control ---- ---  "
-    heat_png = f"{heatmap_prefix}" if png and global_heatmap else None
-    heat_tsv = f"{heatmap_prefix}" if tsv and global_heatmap else None
-    heat_svg = f"{heatmap_prefix}" if svg and global_heatmap else None
+    # Enabled export formats of each kind of chart, paths are "prefix + name" for each format
+    export_formats = tuple(fmt for fmt, enabled in (("png", png), ("tsv", tsv), ("svg", svg)) if enabled)
+
+    heat_exports = export_formats if global_heatmap else ()
     heat_show = show and global_heatmap
 
-    c_heat_png = f"{heatmap_prefix}" if png and cumulative_heatmap else None
-    c_heat_tsv = f"{heatmap_prefix}" if tsv and cumulative_heatmap else None
-    c_heat_svg = f"{heatmap_prefix}" if svg and cumulative_heatmap else None
+    c_heat_exports = export_formats if cumulative_heatmap else ()
     c_heat_show = show and cumulative_heatmap
 
-    c_bar_png = f"{cumulative_prefix}" if png and cumulative_barchart else None
-    c_bar_tsv = f"{cumulative_prefix}" if tsv and cumulative_barchart else None
-    c_bar_svg = f"{cumulative_prefix}" if svg and cumulative_barchart else None
+    c_bar_exports = export_formats if cumulative_barchart else ()
     c_bar_show = show and cumulative_barchart
 
-    q_bar_png = f"{quantitative_prefix}" if png and quantitative_barchart else None
-    q_bar_tsv = f"{quantitative_prefix}" if tsv and quantitative_barchart else None
-    q_bar_svg = f"{quantitative_prefix}" if svg and quantitative_barchart else None
+    q_bar_exports = export_formats if quantitative_barchart else ()
     q_bar_show = show and quantitative_barchart
 
     # ---- ---- Load files ---- ----
-    all_snp = {}  # {Number_of_snp, {File_name : Number_of_genes_with_this_number_of_snp}
+    all_snp = {}  # {File_name : Number_of_snp_of_each_gene}
     all_species = []  # List all targeted files
 
     # process all files and load snp into all_species
-    for files in list_of_files:
-        if files[0] == ".":
-            continue
+    # Files are read by a pool of threads, results are merged in the order of list_of_files
+    read_file = partial(get_snp_counts, name_column=name_column, snp_column=snp_column, separator=file_separator,
+                        include_0=start_at_0, cache_folder=default_cache_folder if cache else None)
 
-        try:
-            files_dict = extract_data_from_table(f"{file_path_prefix}{files}", key=name_column, value=snp_column,
-                                                 filter_=lambda _, val, dict_:
-                                                 filter_integer_greater_or_equal_to_0(val, dict_, start_at_0),
-                                                 # "_" in lambda is mendatory due to how extract_data_from_table works.
-                                                 separator=file_separator)
-        except FilterError as E:
-            print(f"An error occurred : {E}\n"
+    with ThreadPoolExecutor(max_workers=max(1, min(32, len(list_of_files)))) as executor:
+        all_snp_counts = executor.map(read_file, [file_path_prefix + files for files in list_of_files])
 
-                  f"This program only accept positive integer in the following format : '1000', '1_000', '+1000'.\n"
-                  f"Look for miss formated data in {snp_column}")
+        for files in list_of_files:
+            try:
+                snp_counts = next(all_snp_counts)
+            except FilterError as E:
+                print(f"An error occurred : {E}\n"
 
-            return 5
+                      f"This program only accept positive integer in the following format : '1000', '1_000', "
+                      f"'+1000'.\n"
+                      f"Look for miss formated data in {snp_column}")
 
-        if files in path_translation:
-            all_species.append(path_translation[files])
-        else:
-            all_species.append(files)
+                executor.shutdown(cancel_futures=True)
+                return 5
+
+            species = path_translation.get(files, files)
+            all_species.append(species)
 
-        all_snp = compile_gene_snp(files_dict, all_snp, group=all_species[-1])
+            # Files with the same name are considered as the same file
+            if species in all_snp:
+                snp_counts = np.concatenate((all_snp[species], snp_counts))
+            all_snp[species] = snp_counts
 
     if sort_by_name:
         all_species.sort()
@@ -609,27 +838,21 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
     if not all_species:
         return 4
 
-    data, x_legend = make_data_matrix(all_snp, *all_species, simplified=simplified,
-                                      start_value=start_x_value)
+    data, x_legend = compile_data_matrix(all_snp, *all_species, simplified=simplified,
+                                         start_value=start_x_value)
     data, x_legend = shorten_data_matrix(data, x_legend, new_length=max_length)
 
+    # One row per species, one column per number of snp
+    data = np.asarray(data, dtype=np.int64)
+
     # Uniformize all y axis
     if uniform_y:
-        max_quantitative_value = 0
-        max_cumulative_value = 0
-
-        for lines in data:
-            max_quantitative_value = max(max(lines), max_quantitative_value)
-
-            if percent:
-                # max_cumulative_value = max(max(lines) / max(lines) * 100, max_cumulative_value)
-                max_cumulative_value = 100
+        max_quantitative_value = int(data.max()) + 1
 
-            else:
-                max_cumulative_value = max(sum(lines), max_cumulative_value)
-
-        max_quantitative_value += 1
-        max_cumulative_value += 1
+        if percent:
+            max_cumulative_value = 100 + 1
+        else:
+            max_cumulative_value = int(data.sum(axis=1).max()) + 1
 
     else:
         max_quantitative_value = None
@@ -642,78 +865,78 @@ def main(path: str, name_column: str, snp_column: str, file_separator: str = "\t
     u = "heatmap"
     g = "global_heatmap"
 
-    if len(x_legend) == x_legend[-1]:
+    legend_length = len(x_legend)
+    if legend_length and x_legend[-1] == legend_length:
         # if the legend is equivalent of the automatic one, we use the automatic legend
         # (e.g. when @p simplified is False or when there is no simplification),
         x_legend = None
 
     else:
         # When x_legend is not composed of str and @p simplified is True, BarChart have weird behaviour.
-        x_legend = [str(item) for item in x_legend]
+        x_legend = list(map(str, x_legend))
 
     output_readme.write(f"Data analysed.\n")
     
     x_legend = x_legend[:-1] if x_legend is not None else x_legend
 
-    for i in range(0, len(data)):
-        line_name = all_species[i]
-
-        # Make quantitative barchart
-        if quantitative_barchart:
-            make_bar_char(data[i][:-1], x_legend=x_legend if x_legend else x_legend, chart_name=line_name,
-                          ylabel=legends[lm][q]["ylabel"],
-                          xlabel=legends[lm][q]["xlabel"],
-                          title=legends[lm][q]["title"].format(line_name),
-                          show=q_bar_show,
-                          png=f"{q_bar_png}{line_name}" if q_bar_png else None,
-                          tsv=f"{q_bar_tsv}{line_name}" if q_bar_tsv else None,
-                          svg=f"{q_bar_svg}{line_name}" if q_bar_svg else None,
-                          y_max_value=max_quantitative_value,
-                          transparent=transparent, start_x_value=start_x_value)
-
-        # Replace the quantitative list by a cumulative list
-        data[i] = generate_cumulative_list(data[i], reversed_=True, percent=percent)[:-1]
-
-
-        # Make cumulative Barchart
-        if cumulative_barchart:
-            make_bar_char(data[i],
-                          show=c_bar_show, x_legend=x_legend, chart_name=line_name,
-                          ylabel=legends[lm][c]["ylabel"],
-                          xlabel=legends[lm][c]["xlabel"],
-                          title=legends[lm][c]["title"].format(line_name),
-                          png=f"{c_bar_png}{line_name}" if c_bar_png else None,
-                          tsv=f"{c_bar_tsv}{line_name}" if c_bar_tsv else None,
-                          svg=f"{c_bar_svg}{line_name}" if c_bar_svg else None,
-                          y_max_value=max_cumulative_value,
-                          transparent=transparent, start_x_value=start_x_value)
+    # Cumulative matrix of all species at once, the last column is dropped
+    cumulative_data = np.cumsum(data[:, ::-1], axis=1)[:, ::-1]
+    if percent:
+        # Species without genes (total equal to 0) stay at 0 %
+        totals = cumulative_data[:, :1]
+        cumulative_data = np.divide(cumulative_data, totals, out=np.zeros(cumulative_data.shape),
+                                    where=totals != 0) * 100
+    cumulative_data = cumulative_data[:, :-1]
+
+    # Barcharts are made species by species, the loop is skipped when only heatmaps are requested
+    if quantitative_barchart or cumulative_barchart:
+        for i in range(0, len(data)):
+            line_name = all_species[i]
+
+            # Make quantitative barchart
+            if quantitative_barchart:
+                make_bar_char(data[i, :-1], x_legend=x_legend if x_legend else x_legend, chart_name=line_name,
+                              ylabel=legends[lm][q]["ylabel"],
+                              xlabel=legends[lm][q]["xlabel"],
+                              title=legends[lm][q]["title"].format(line_name),
+                              show=q_bar_show,
+                              **{fmt: quantitative_prefix + line_name for fmt in q_bar_exports},
+                              y_max_value=max_quantitative_value,
+                              transparent=transparent, start_x_value=start_x_value)
+
+            # Make cumulative Barchart
+            if cumulative_barchart:
+                make_bar_char(cumulative_data[i],
+                              show=c_bar_show, x_legend=x_legend, chart_name=line_name,
+                              ylabel=legends[lm][c]["ylabel"],
+                              xlabel=legends[lm][c]["xlabel"],
+                              title=legends[lm][c]["title"].format(line_name),
+                              **{fmt: cumulative_prefix + line_name for fmt in c_bar_exports},
+                              y_max_value=max_cumulative_value,
+                              transparent=transparent, start_x_value=start_x_value)
 
     # Heatmap generation
     if cumulative_heatmap:
         print(start_x_value)
-        for i, lines in enumerate(data):
+        for i, lines in enumerate(cumulative_data):
             line_name = all_species[i]
-            make_heatmap([lines], y_legend=[all_species[i]], x_legend=x_legend,
+            make_heatmap(lines[np.newaxis], y_legend=[all_species[i]], x_legend=x_legend,
                          ylabel=legends[lm][u]["ylabel"],
                          xlabel=legends[lm][u]["xlabel"],
                          title=legends[lm][u]["title"].format(line_name),
                          show=c_heat_show,
-                         png=f"{c_heat_png}_{all_species[i]}" if c_heat_png else None,
-                         tsv=f"{c_heat_tsv}_{all_species[i]}" if c_heat_tsv else None,
-                         svg=f"{c_heat_svg}_{all_species[i]}" if c_heat_svg else None,
+                         **{fmt: f"{heatmap_prefix}_{line_name}" for fmt in c_heat_exports},
                          contain_number=show_values,
                          y_max_value=max_cumulative_value,
                          transparent=transparent, start_x_value=start_x_value)
 
     if global_heatmap:
-        make_heatmap(data, y_legend=all_species, x_legend=x_legend,
+        make_heatmap(cumulative_data, y_legend=all_species, x_legend=x_legend,
                      ylabel=legends[lm][g]["ylabel"],
                      xlabel=legends[lm][g]["xlabel"],
                      title=legends[lm][g]["title"],
                      show=heat_show,
-                     png=heat_png + "_global" if heat_png else None,
-                     tsv=heat_tsv + "_global" if heat_tsv else None,
-                     svg=heat_svg + "_global" if heat_svg else None,
+                     **{fmt: heatmap_prefix + "_global" for fmt in heat_exports},
                      contain_number=show_values,
                      y_max_value=max_cumulative_value,
                      transparent=transparent, start_x_value=start_x_value)
@@ -731,8 +954,9 @@ def main_using_getopts(argv: list[str] or str):
         - main_using_getopts("name_column snp_column tests/TargetedFiles.json -m 20 -gv -w -j Tests -e -1")
 
     @param argv : list[str] or str => List of argument (strings). Usually sys.argv[1:].
-    @note If the first values are not known option (option in @p getopts_options), the function will consider that
-    those values correspond to the nth first option that require an argument in @p getopts_options.
+    @note Values that are not options (option in @p getopts_options) nor option's values can be anywhere in argv,
+    the function will consider that those values correspond to the nth first option that require an argument in
+    @p getopts_options.
     In below example, you can give two arguments. The first will be matched with "Alpha" and the last with "Beta".
     @code
     argv = ["5", "6"]
@@ -752,8 +976,9 @@ def main_using_getopts(argv: list[str] or str):
     try:
         main_params = getopts_parser.getopts(argv, __getopts__, "name_column", "snp_column",
                                              help_options=("help", "h"),
+                                             digested_options=__digested_getopts__,
                                              raise_errors=False,
-                                             help_message=help_usage())
+                                             help_message=help_usage)
         if isinstance(main_params, int):
             exit(main_params + 10)
 
@@ -3,11 +3,16 @@
 """! @brief Script to use in order to test "snp_analyser" functionalities.
  @file test_snp_analyser.py
  @section libs Libraries / Modules
+  - os
+  - tempfile
   - snp_analyser
   - pytest
  @section authors Author(s)
   - Created by Marchal Florent on 17/5/2024 .
 """
+import os
+import tempfile
+
 try:
     import scripts.snp_analyser as snp
     import pytest
@@ -48,6 +53,100 @@ def test_greater_than_0_int_filter():
         assert snp.filter_integer_greater_or_equal_to_0_ignore_0("1.0")
 
 
+def test_filter_snp_counts():
+    """@brief Test filter_snp_counts"""
+    genes = {"gene0": "0", "gene1": "+2000", "gene2": "20_00", "gene3": 3}
+
+    assert snp.filter_snp_counts(genes) == {"gene0": 0, "gene1": 2000, "gene2": 2000, "gene3": 3}
+    assert snp.filter_snp_counts(genes, include_0=False) == {"gene1": 2000, "gene2": 2000, "gene3": 3}
+    assert snp.filter_snp_counts({}) == {}
+
+    # Pairs : every occurrence is checked, the last one is kept
+    assert snp.filter_snp_counts([("a", "1"), ("b", "2"), ("a", "0")]) == {"a": 0, "b": 2}
+    assert snp.filter_snp_counts([("a", "1"), ("b", "2"), ("a", "0")], include_0=False) == {"b": 2}
+    with pytest.raises(snp.FilterError):
+        snp.filter_snp_counts([("a", "-1"), ("b", "2"), ("a", "3")])
+    with pytest.raises(snp.FilterError):
+        snp.filter_snp_counts([("a", "x"), ("a", "3")])
+
+    with pytest.raises(snp.FilterError):
+        snp.filter_snp_counts({"gene0": "-1000"})
+    with pytest.raises(snp.FilterError):
+        snp.filter_snp_counts({"gene0": "1.0"})
+    with pytest.raises(snp.FilterError):
+        snp.filter_snp_counts({"gene0": "99999999999999999999"})
+
+
+def test_load_snp_counts():
+    """@brief Test load_snp_counts"""
+    genes = snp.load_snp_counts("tests/data/test1", "Contig_name", "BiAllelic_SNP")
+    assert len(genes) == 37
+    assert genes["contig_1"] == 1
+    assert genes["contig_14"] == 0
+
+    assert snp.load_snp_counts("tests/data/test1", "Contig_name", "BiAllelic_SNP", chunk_size=5) == genes
+    assert "contig_14" not in snp.load_snp_counts("tests/data/test1", "Contig_name", "BiAllelic_SNP",
+                                                  include_0=False, chunk_size=5)
+
+    # Errors name the file
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "flatfile")
+        with open(path, "w") as flatfile:
+            flatfile.write("name\tsnp\na\t1\nb\t-2\n")
+
+        with pytest.raises(snp.FilterError, match="flatfile"):
+            snp.load_snp_counts(path, "name", "snp")
+
+        # An invalid value is rejected even when a later line of the same chunk replaces it
+        with open(path, "w") as flatfile:
+            flatfile.write("name\tsnp\na\t-1\nb\t2\na\t3\n")
+
+        for chunk_size in (1, 2, 1_000_000):
+            with pytest.raises(snp.FilterError):
+                snp.load_snp_counts(path, "name", "snp", chunk_size=chunk_size)
+
+
+def test_get_snp_counts():
+    """@brief Test get_snp_counts"""
+    expected = sorted(snp.load_snp_counts("tests/data/test2", "Contig_name", "BiAllelic_SNP").values())
+    assert sorted(snp.get_snp_counts("tests/data/test2", "Contig_name", "BiAllelic_SNP").tolist()) == expected
+
+    with tempfile.TemporaryDirectory() as cache_folder:
+        for _ in range(2):  # Fill the cache then use it
+            snp_counts = snp.get_snp_counts("tests/data/test2", "Contig_name", "BiAllelic_SNP",
+                                            cache_folder=cache_folder)
+            assert sorted(snp_counts.tolist()) == expected
+            assert len(os.listdir(cache_folder)) == 1
+
+        snp.get_snp_counts("tests/data/test2", "Contig_name", "BiAllelic_SNP", include_0=False,
+                           cache_folder=cache_folder)
+        assert len(os.listdir(cache_folder)) == 2
+
+        # A truncated cache file is computed and saved again
+        for cache_file in os.listdir(cache_folder):
+            with open(os.path.join(cache_folder, cache_file), "wb") as truncated:
+                truncated.write(b"\x93NUMPY")
+
+        snp.get_snp_counts_of_file_state.cache_clear()
+        snp_counts = snp.get_snp_counts("tests/data/test2", "Contig_name", "BiAllelic_SNP", cache_folder=cache_folder)
+        assert sorted(snp_counts.tolist()) == expected
+        assert len(os.listdir(cache_folder)) == 2
+
+    # Files are read again only when modified
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "flatfile")
+        with open(path, "w") as flatfile:
+            flatfile.write("name\tsnp\na\t1\nb\t2\n")
+
+        snp_counts = snp.get_snp_counts(path, "name", "snp")
+        assert snp.get_snp_counts(path, "name", "snp") is snp_counts
+
+        with open(path, "a") as flatfile:
+            flatfile.write("c\t30\n")
+
+        assert sorted(snp.get_snp_counts(path, "name", "snp").tolist()) == [1, 2, 30]
+
+
 def test_compile_gene_snp():
     """@brief Test compile_gene_snp"""
     genes1 = {
@@ -111,6 +210,14 @@ def test_compile_gene_snp():
     assert snp.compile_gene_snp(genes1_b_bis, group="b", dict_of_number=temp) == a_b_result2
     assert snp.compile_gene_snp(genes_c_bis, group="c", dict_of_number=temp) == a_c_b_result
 
+    assert snp.compile_gene_snp(snp.np.array([0, 3, 4, 4, 1, 4, 2, 3, 2, 1])) == none_result
+    assert snp.compile_gene_snp(snp.np.array([], dtype=snp.np.int64)) == {}
+
+    # A plain dict is updated in place
+    plain = {3: {'a': 1}}
+    assert snp.compile_gene_snp(genes1_b, group="b", dict_of_number=plain) is plain
+    assert plain == {3: {'a': 1, 'b': 1}, 4: {'b': 1}, 1: {'b': 1}, 2: {'b': 2}}
+
 
 def test_make_data_matrix():
     """@brief Test make_data_matrix"""
@@ -151,18 +258,43 @@ def test_make_data_matrix():
                                                                                    [2, 8, 2, 2, 3, 0, 6]
                                                                                    ],
                                                                                   [1, 2, 3, 4, 6, 8, 12])
+    assert snp.make_data_matrix(a_c_b_result, "b", "b", simplified=True) == ([[2, 8, 2, 2, 3, 0, 6],
+                                                                              [2, 8, 2, 2, 3, 0, 6]],
+                                                                             [1, 2, 3, 4, 6, 8, 12])
+    assert snp.make_data_matrix({}, "a", simplified=False) == ([[]], [])
     '''assert snp.make_data_matrix(a_c_b_result, "a", simplified=False, max_length=5) == ([[7, 0, 3, 8, 0, 0]],
                                                                                        [1, 2, 3, 4, 5, 6])
     assert snp.make_data_matrix(a_c_b_result, "a", simplified=True, max_length=5) == ([[7, 0, 3, 8, 0]],
                                                                                       [1, 2, 3, 4, 6])'''
 
 
+def test_compile_data_matrix():
+    """@brief Test compile_data_matrix"""
+    snp_counts = {"a": snp.np.array([1, 3, 4, 4, 1, 3, 3]),
+                  "b": snp.np.array([2, 12, 6, 2, 0, 2]),
+                  "c": snp.np.array([8, 1, 2, 2, 0])}
+    compiled = {}
+    for group, counts in snp_counts.items():
+        compiled = snp.compile_gene_snp(counts, compiled, group=group)
+
+    for groups in (("a", ), ("b", "c"), ("c", "a", "b"), ("a", "d")):
+        for simplified in (True, False):
+            for max_length in (None, 3):
+                for start_value in (0, 1):
+                    assert (snp.compile_data_matrix(snp_counts, *groups, simplified=simplified,
+                                                    max_length=max_length, start_value=start_value) ==
+                            snp.make_data_matrix(compiled, *groups, simplified=simplified,
+                                                 max_length=max_length, start_value=start_value))
+
+
 def test_generate_cumulative_list():
     "list_of_numbers: list[int] or list[float], reversed_=False"
     assert snp.generate_cumulative_list([3, 35, 2, 1, 3, 4]) == [3, 38, 40, 41, 44, 48]
     assert snp.generate_cumulative_list([3, 35, 2, 1, 3, 4], reversed_=True) == [48, 45, 10, 8, 7, 4]
     assert snp.generate_cumulative_list([0, 0, 2, 1, 0.35, 0]) == [0, 0, 2, 3, 3.35, 3.35]
     assert snp.generate_cumulative_list([0, 0, 2, 1, 0.35, 0], reversed_=True) == [3.35, 3.35, 3.35, 1.35, 0.35, 0]
+    assert snp.generate_cumulative_list([1, 2, 1], reversed_=True, percent=True) == [100, 75, 25]
+    assert snp.generate_cumulative_list([]) == []
 
 
 def test_all():
@@ -171,7 +303,11 @@ def test_all():
     """
     test_compile_gene_snp()
     test_greater_than_0_int_filter()
+    test_filter_snp_counts()
+    test_load_snp_counts()
+    test_get_snp_counts()
     test_make_data_matrix()
+    test_compile_data_matrix()
     test_generate_cumulative_list()
 
 
@@ -4,25 +4,57 @@
 It's a toolbox for scripts/snp_analyser.py
 """
 
+
+def missing_module_message(module_name: str) -> str:
+    """!
+    @brief Message displayed when a required module is not installed.
+
+    @param module_name : str => Name of the missing module (as used by pip)
+    @return str => The message
+    """
+    return (f"Open a terminal and try : "
+            f"\n\tpip install {module_name}"
+
+            f"\n\nIf pip is not found, you can install it using : "
+            f"\nOn linux or MacOs: "
+            f"\n\tpython -m ensurepip --upgrade"
+            f"\nOn Windows : "
+            f"\n\tpy -m ensurepip --upgrade"
+            f"\n\nIf pip remains undetected, try to edit the system environment variables by adding pip to PATH.")
+
+
 try:
-    import matplotlib.pyplot as plt
-    from matplotlib.colors import Normalize
-    from matplotlib.cm import ScalarMappable
+    import numpy as np
 
 except ModuleNotFoundError as E:
-    print(f"Module not found : {E}\n"
-          f"Open a terminal and try : "
-          f"\n\tpip install matplotlib"
-          
-          f"\n\nIf pip is not found, you can install it using : "
-          f"\nOn linux or MacOs: "
-          f"\n\tpython -m ensurepip --upgrade"
-          f"\nOn Windows : "
-          f"\n\tpy -m ensurepip --upgrade"
-          f"\n\nIf pip remains undetected, try to edit the system environment variables by adding pip to PATH."
-          )
+    print(f"Module not found : {E}\n" + missing_module_message("numpy"))
     exit(1)
 
+# matplotlib.pyplot is imported by import_pyplot, only when a chart is made
+plt = None
+
+
+def import_pyplot():
+    """!
+    @brief Import matplotlib.pyplot the first time it is needed. Importing it takes a noticeable part of the start-up
+    time, this is not needed to read files or display the help message.
+
+    @return module => matplotlib.pyplot
+    """
+    global plt
+
+    if plt is None:
+        try:
+            import matplotlib.pyplot as pyplot
+
+        except ModuleNotFoundError as E:
+            print(f"Module not found : {E}\n" + missing_module_message("matplotlib"))
+            exit(1)
+
+        plt = pyplot
+
+    return plt
+
 
 class FilterError(ValueError):
     """An error raised by @ref extract_data_from_table when a filter_ raise an error"""
@@ -47,9 +79,6 @@ def export_list_in_tsv_as_rows(path: str, *rows, file_mode="w", encoding="UTF-8"
     @param y_legend : list = None => A list of item to be display in the first column
     @param x_legend : list = None => A list of item to be display in the first line
     """
-    # Open file
-    file_flux = open(path, mode=file_mode, encoding=encoding)
-
     if x_legend:
         # Add the legend
         rows = [x_legend, *rows]
@@ -59,32 +88,37 @@ def export_list_in_tsv_as_rows(path: str, *rows, file_mode="w", encoding="UTF-8"
         if y_legend is not None and len(y_legend) < len(rows):
             y_legend = ["", *y_legend]
 
-    i = 0   # Initialise i for the last block of instruction
-    for i, lines in enumerate(rows):
+    # Open file (closed even if an error occurs)
+    with open(path, mode=file_mode, encoding=encoding, buffering=1 << 20) as file_flux:
+        buffer = []  # Lines waiting to be written
+        i = 0   # Initialise i for the last block of instruction
+        for i, lines in enumerate(rows):
+            line = ""
 
-        # Add y_legend at the beginning of each lines
-        if y_legend:
-            if i < len(y_legend):   # Assure that y_legend can not create errors
-                file_flux.write(y_legend[i])
+            # Add y_legend at the beginning of each lines
+            if y_legend:
+                if i < len(y_legend):   # Assure that y_legend can not create errors
+                    line = y_legend[i]
 
-            file_flux.write("\t")
+                line += "\t"
 
-        # Write line content
-        for word in lines:
-            file_flux.write(str(word) + "\t")
+            # Write line content and end line
+            line += "".join([str(word) + "\t" for word in lines]) + "\n"
+            buffer.append(line)
 
-        # End line
-        file_flux.write("\n")
+            # Write lines by batch
+            if len(buffer) >= 4096:
+                file_flux.write("".join(buffer))
+                buffer.clear()
 
-    # Assure that y_legend is completely written
-    if y_legend:
-        while i < len(y_legend) - 1:
-            file_flux.write(y_legend[i])
-            file_flux.write("\t")
-            i += 1
+        file_flux.write("".join(buffer))
 
-    # Close file
-    file_flux.close()
+        # Assure that y_legend is completely written
+        if y_legend:
+            while i < len(y_legend) - 1:
+                file_flux.write(y_legend[i])
+                file_flux.write("\t")
+                i += 1
 
 
 def chart_export(data: list[list[int]], show: bool = False, png: str = None, tsv: str = None, svg: str = None,
@@ -107,13 +141,18 @@ def chart_export(data: list[list[int]], show: bool = False, png: str = None, tsv
      @param transparent : bool = True => Chart are exported with a transparent background
 
     """
+    plt = import_pyplot()
+
+    # The current figure is fetched once for all formats
+    figure = plt.gcf() if png is not None or svg is not None else None
+
     # Png export
     if png is not None:
-        plt.savefig(png + ".png", format='png', transparent=transparent)
+        figure.savefig(png + ".png", format='png', transparent=transparent)
 
     # svg export (Scalable Vector Graphic )
     if svg is not None:
-        plt.savefig(svg + ".svg", format='svg', transparent=transparent)
+        figure.savefig(svg + ".svg", format='svg', transparent=transparent)
 
     # Export tsv (flat file)
     if tsv is not None:
@@ -135,18 +174,39 @@ def parse_line(legend: list[str], line: str, separator: str = "\t") -> dict[str,
     @note The returned dict always contain the same number of object than legend.
         - If legend > line : part of the legend's values will point to an empty string
         - If legend < line : part of the line will be ignored
+    @note The line ending ("\n") is not part of the last value.
     """
+    split_line = line.rstrip("\n").split(separator)  # Split the line in "columns"
+
+    # Missing values are empty strings
+    if len(split_line) < len(legend):
+        split_line += [""] * (len(legend) - len(split_line))
 
-    parsed_line = {}
-    split_line = line.split(separator)  # Split the line in "columns"
+    return dict(zip(legend, split_line))
 
-    # Fill parsed_line
-    for i, column_name in enumerate(legend):
-        cell_value = split_line[i] if i < len(split_line) else ""
-        parsed_line[column_name] = cell_value
-        i += 1
 
-    return parsed_line
+# Powers of 10 used by associate_power_of_10, from the biggest to the smallest
+powers_of_10 = [
+    (10**24, 'Yotta', 'Y'),
+    (10**21, 'Zetta', 'Z'),
+    (10**18, 'Exa', 'E'),
+    (10**15, 'Peta', 'P'),
+    (10**12, 'Tera', 'T'),
+    (10**9, 'Giga', 'G'),
+    (10**6, 'Mega', 'M'),
+    (10**3, 'Kilo', 'k'),
+
+    (10**0, '', ''),
+
+    (10**-3, 'Milli', 'm'),
+    (10**-6, 'Micro', 'µ'),
+    (10**-9, 'Nano', 'n'),
+    (10**-12, 'Pico', 'p'),
+    (10**-15, 'Femto', 'f'),
+    (10**-18, 'Atto', 'a'),
+    (10**-21, 'Zepto', 'z'),
+    (10**-24, 'Yocto', 'y'),
+]
 
 
 def associate_power_of_10(value: float or int) -> str:
@@ -154,27 +214,6 @@ def associate_power_of_10(value: float or int) -> str:
     @param value: float or int => A vlue that you want to convet.
     @return:  a 3-digit number with their power of 10. e.g. : 3.00 K, 1.00, 10.0, 19.2 T
     """
-    powers_of_10 = [
-        (10**24, 'Yotta', 'Y'),
-        (10**21, 'Zetta', 'Z'),
-        (10**18, 'Exa', 'E'),
-        (10**15, 'Peta', 'P'),
-        (10**12, 'Tera', 'T'),
-        (10**9, 'Giga', 'G'),
-        (10**6, 'Mega', 'M'),
-        (10**3, 'Kilo', 'k'),
-
-        (10**0, '', ''),
-
-        (10**-3, 'Milli', 'm'),
-        (10**-6, 'Micro', 'µ'),
-        (10**-9, 'Nano', 'n'),
-        (10**-12, 'Pico', 'p'),
-        (10**-15, 'Femto', 'f'),
-        (10**-18, 'Atto', 'a'),
-        (10**-21, 'Zepto', 'z'),
-        (10**-24, 'Yocto', 'y'),
-    ]
     if value == 0:
         return "0"
 
@@ -182,12 +221,8 @@ def associate_power_of_10(value: float or int) -> str:
         value *= -1
 
     # Iterate through the powers of 10 to find the correct one
-    final_value = None
     for power, name, symbol in powers_of_10:
-        if final_value is not None:
-            continue
-
-        if abs(value) >= power:
+        if value >= power:
             normalized = str(value / power)
             normalized = normalized[0:4]
 
@@ -199,9 +234,9 @@ def associate_power_of_10(value: float or int) -> str:
             if len(normalized) == 3 and "." in normalized:
                 normalized += "0"
 
-            final_value = f"{normalized} {symbol}"
+            return f"{normalized} {symbol}"
 
-    return final_value
+    return None
 
 
 def extract_data_from_table(path: str, key: str, value: str, separator: str = "\t",
@@ -224,64 +259,76 @@ def extract_data_from_table(path: str, key: str, value: str, separator: str = "\
                 - If it returns True or None: value in the column @p value.
                 - If it returns False: this line is ignored.
                 - Else: The returned value is used (instead of the content of the column @p value).
-    @note filter_ is called one time per line.
+    @note filter_ is called one time per line. When no filter_ is given, lines are yielded as they are read.
     @return A generator: (values in the column @p key (values that do not pass @p filter_ are ignored), values in the
     column @p value OR value returned by @p filter_)
     """
-    # Open file
-    flux = open(path, "r", encoding="UTF-8")
-
     # Researched keys and values should be contained inside the legend.
     if legend is not None and (key not in legend or value not in legend):
         raise ValueError(f"Both key ('{key}') and value {value} should be contained inside legend : {legend}")
 
-    # Fill data
-    line_number = 0
-    for line in flux:
-        line_number += 1
+    # Position of the researched columns
+    key_index = value_index = None
+    if legend is not None:
+        key_index, value_index = legend.index(key), legend.index(value)
 
-        # Special cases : empty line | empty file
-        if line == "\n" or line == "":
-            continue
+    # Open file (closed even if an error occurs)
+    with open(path, "r", encoding="UTF-8", buffering=1 << 20) as flux:
+        # Fill data
+        line_number = 0
+        for line in flux:
+            line_number += 1
 
-        # Special cases : Unknown legend
-        if legend is None:
-            legend = line.split(separator)
-            legend = [item.strip() for item in legend if item.strip()]
+            # Special cases : empty line | empty file
+            if line == "\n" or line == "":
+                continue
 
-            # Researched keys and values should be contained inside the legend.
-            if key not in legend or value not in legend:
-                raise ValueError(f"Both key ('{key}') and value ('{value}') should be contained inside the "
-                                 f"legend : {legend}")
+            # Special cases : Unknown legend
+            if legend is None:
+                legend = line.split(separator)
+                legend = [item.strip() for item in legend if item.strip()]
 
-            if legend[-1][-1] == "\n":
-                legend[-1] = legend[-1][:-1]
-            continue
+                # Researched keys and values should be contained inside the legend.
+                if key not in legend or value not in legend:
+                    raise ValueError(f"Both key ('{key}') and value ('{value}') should be contained inside the "
+                                     f"legend : {legend}")
 
-        # Parse the line
-        parsed_line = parse_line(legend, line, separator)
+                if legend[-1][-1] == "\n":
+                    legend[-1] = legend[-1][:-1]
 
-        # Apply the filter_
-        try:
-            func_result = filter_(key, value, parsed_line) if filter_ else None
+                key_index, value_index = legend.index(key), legend.index(value)
+                continue
 
-        except Exception as E:
-            raise FilterError(f"Filter error at the line '{line_number}' in the column '{key}' in the file {path} : "
-                              f"\n {E}")
+            line = line.rstrip("\r\n")
 
-        if func_result is False:
-            continue
+            # Without filter_, only the two researched cells are needed
+            if filter_ is None:
+                cells = line.split(separator)
+                yield (cells[key_index] if key_index < len(cells) else "",
+                       cells[value_index] if value_index < len(cells) else "")
+                continue
 
-        if func_result is None or func_result is True:
-            # Save  parsed_line[value]
-            yield key, parsed_line[value]
+            # Parse the line
+            parsed_line = parse_line(legend, line, separator)
 
-        else:
-            # Save  func_result
-            yield key, func_result
+            # Apply the filter_
+            try:
+                func_result = filter_(key, value, parsed_line)
+
+            except Exception as E:
+                raise FilterError(f"Filter error at the line '{line_number}' in the column '{key}' in the file {path} : "
+                                  f"\n {E}")
+
+            if func_result is False:
+                continue
 
-    # Close file
-    flux.close()
+            if func_result is None or func_result is True:
+                # Save  parsed_line[value]
+                yield parsed_line[key], parsed_line[value]
+
+            else:
+                # Save  func_result
+                yield parsed_line[key], func_result
 
 
 def make_bar_char(data: list[int],
@@ -318,37 +365,42 @@ def make_bar_char(data: list[int],
     allow you to select the first value in the x-axis.
     """
 
-    # Clear last plot
+    plt = import_pyplot()
+
+    # Clear last plot (closing the figures is enough, a new one is created below)
     if erase_last_plt:
         plt.close('all')
-        plt.clf()
-        plt.cla()
 
+    # Figure and axes are fetched once, pyplot's current figure is not looked up again
     if y_max_value is not None and y_max_value >= 1:
         fig, ax = plt.subplots()
         ax.set_ylim(0, y_max_value)
 
+    else:
+        fig = plt.gcf()
+        ax = fig.gca()
+
     # Add ticks
     if x_legend:
-        plt.bar(x_legend, data, color='skyblue')
-        plt.xticks(range(len(data)), x_legend)
+        ax.bar(x_legend, data, color='skyblue')
+        ax.set_xticks(range(len(data)), x_legend)
 
     else:
         x_legend = list(range(start_x_value, len(data) + start_x_value))
-        plt.bar(x_legend, data, color='skyblue')
+        ax.bar(x_legend, data, color='skyblue')
 
     # Assure that y-axis and x-axis use display only integer. (Just some plt magic)
     if y_legend_is_int:
-        plt.gca().yaxis.set_major_locator(plt.MaxNLocator(integer=True))
+        ax.yaxis.set_major_locator(plt.MaxNLocator(integer=True))
 
     if x_legend_is_int:
-        plt.gca().xaxis.set_major_locator(plt.MaxNLocator(integer=True))
+        ax.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
 
     # Add labels
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.gcf().canvas.manager.set_window_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    fig.canvas.manager.set_window_title(title)
 
     # export chart
     chart_export(data=[data], x_legend=x_legend, tsv=tsv, png=png, show=show, svg=svg, y_legend=[chart_name],
@@ -379,8 +431,8 @@ def make_heatmap(data: list[list[int]],
     @param tsv : str = None => Give a path to export @p data into a tsv.
     @param svg : str = None => Give a path to export the current plot as svg
     @param erase_last_plt : bool = True => If True, last plot is removed from @ref matplotlib.pyplot memory
-    @param contain_number : int = None => If greater or equal to 0, all cells will contain theirs values. if lower than 0,
-    text in cell in automatically determined. If None, nothing happen.
+    @param contain_number : int = None => If greater or equal to 0, all cells will contain theirs values (cells equal to
+    0 stay empty). if lower than 0, text in cell in automatically determined. If None, nothing happen.
     @param uniq_color : str = #a0a0a0 => HTML color code for text inside cells
         @note Only when contain_number is True
     @param y_max_value : int = None => The y-axis will stop at this value
@@ -407,10 +459,11 @@ def make_heatmap(data: list[list[int]],
      'twilight_shifted', 'twilight_shifted_r', 'viridis', 'viridis_r', 'winter', 'winter_r'
     """
 
+    plt = import_pyplot()
+    from matplotlib.colors import Normalize
+
     # Clear the last plot
     if erase_last_plt:
-        plt.clf()
-        plt.cla()
         plt.close('all')
 
     # Number of rows and columns
@@ -420,33 +473,32 @@ def make_heatmap(data: list[list[int]],
     # Create heatmap
     fig_size = (num_cols + 1, max(num_rows + 1, 4))
 
-    plt.figure(figsize=fig_size)
-    plt.imshow(data, cmap=cmap, interpolation='nearest', vmin=1, vmax=y_max_value)
+    fig, ax = plt.subplots(figsize=fig_size)  # Figure and axes are fetched once
+    image = ax.imshow(data, cmap=cmap, interpolation='nearest', vmin=1, vmax=y_max_value)
     cmap_obj = plt.get_cmap(cmap)
     norm_obj = Normalize(vmin=1, vmax=y_max_value)
 
     # Add ticks
     if x_legend:
-        plt.xticks(range(start_x_value, num_cols+start_x_value), x_legend)
+        ax.set_xticks(range(start_x_value, num_cols+start_x_value), x_legend)
     else:
         x_legend = [str(i) for i in range(start_x_value, num_cols + start_x_value)]
-        plt.xticks(range(num_cols), x_legend)
+        ax.set_xticks(range(num_cols), x_legend)
 
     if y_legend:
-        plt.yticks(range(num_rows), y_legend)
+        ax.set_yticks(range(num_rows), y_legend)
 
     # Add labels
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.title(title)
-    plt.gcf().canvas.manager.set_window_title(title)
-    plt.gca().xaxis.set_major_locator(plt.MaxNLocator(integer=True))
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    fig.canvas.manager.set_window_title(title)
+    ax.xaxis.set_major_locator(plt.MaxNLocator(integer=True))
 
     # Add color bar
-    cbar = plt.colorbar()
+    cbar = fig.colorbar(image, ax=ax)
     cbar.set_label('Number of genes')
-    cbar.set_label('Number of genes')
-    plt.gca().set_aspect('equal', adjustable='box')
+    ax.set_aspect('equal', adjustable='box')
     if contain_number is not None:
         # Add text labels inside heatmap cells
 
@@ -455,23 +507,29 @@ def make_heatmap(data: list[list[int]],
         else:
             font_size = contain_number
 
-        for i in range(len(data)):
-            for j in range(len(data[0])):
-                str_data = associate_power_of_10(data[i][j])
+        values = np.asarray(data)
 
-                if str_data is None or str_data == "None":
-                    str_data = "0"
+        # Each distinct value is formatted only once
+        unique_values, label_index = np.unique(values, return_inverse=True)
+        label_index = label_index.reshape(values.shape)
+        labels = []
+        for value in unique_values.tolist():
+            str_data = associate_power_of_10(value)
+            labels.append("0" if str_data is None or str_data == "None" else str_data)
 
-                if uniq_color is None:
-                    rgb = cmap_obj(norm_obj(data[i][j]))[:3]  # Get RGB values
-                    brightness = 0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]
-                    color = 'white' if brightness < 0.5 else 'black'
+        # Text color of each cell, computed for all cells at once
+        if uniq_color is None:
+            rgb = cmap_obj(norm_obj(values))[..., :3]  # Get RGB values
+            brightness = rgb @ np.array([0.299, 0.587, 0.114])
+            colors = np.where(brightness < 0.5, 'white', 'black')
 
-                else:
-                    color = uniq_color
+        else:
+            colors = np.full(values.shape, uniq_color)
 
-                # Place text
-                plt.text(j, i, f'{str_data}', ha='center', va='center', color=color, fontsize=font_size)
+        # Place text (cells equal to 0 stay empty)
+        for i, j in np.argwhere(values != 0).tolist():
+            ax.text(j, i, labels[label_index[i, j]], ha='center', va='center', color=colors[i, j],
+                    fontsize=font_size)
 
     chart_export(data=data, y_legend=y_legend, x_legend=x_legend, tsv=tsv, png=png, show=show, svg=svg,
                  transparent=transparent)